@@ -1,10 +1,32 @@
-from itertools import count
-from typing import List, Set
+from array import array
+from collections import defaultdict
+from itertools import accumulate, count
+from typing import Dict, Iterator, List, Optional, Set, Tuple
 
 
-def parse_changes(path: str) -> List[int]:
-    with open(path) as file:
-        return [int(line.strip()) for line in file]
+def stream_changes(path: str, chunk_size: int = 2 ** 16) -> Iterator[int]:
+    """
+    Yield changes from a file read `chunk_size` bytes at a time, so memory
+    use doesn't grow with the file.
+    """
+    with open(path, 'rb') as file:
+        remainder = b''
+        while True:
+            chunk = file.read(chunk_size)
+            if not chunk:
+                break
+            lines = (remainder + chunk).split(b'\n')
+            # The last line may continue into the next chunk
+            remainder = lines.pop()
+            for line in lines:
+                if line.strip():
+                    yield int(line)
+        if remainder.strip():
+            yield int(remainder)
+
+
+def parse_changes(path: str) -> array:
+    return array('q', stream_changes(path))
 
 
 def apply_changes(initial: int, changes: List[int]) -> int:
@@ -28,6 +50,46 @@ def calibrate(initial: int, changes: List[int]):
             seen.add(value)
 
 
+def calibrate_closed_form(initial: int, changes: List[int]) -> Optional[int]:
+    """
+    Find the first repeated frequency without cycling through the changes.
+
+    After k full cycles, the i-th partial sum s_i has become s_i + k * drift,
+    where drift is the net change per cycle. So s_i eventually hits s_j only if
+    they share a residue modulo drift, after (s_j - s_i) / drift cycles. Within
+    each residue bucket, sorted in the direction of drift, only neighbours can
+    give the earliest hit.
+    """
+    partial_sums = list(accumulate(changes, initial=initial))
+    drift = partial_sums.pop() - initial
+
+    # Repeats within the first cycle come before any later ones
+    seen: Set[int] = set()
+    for value in partial_sums:
+        if value in seen:
+            return value
+        seen.add(value)
+
+    if not partial_sums:
+        return None
+    if drift == 0:
+        return initial
+
+    buckets: Dict[int, List[Tuple[int, int]]] = defaultdict(list)
+    for i, value in enumerate(partial_sums):
+        buckets[value % drift].append((value, i))
+
+    best: Optional[Tuple[int, int]] = None
+    for bucket in buckets.values():
+        bucket.sort(reverse=drift < 0)
+        for (value, i), (next_value, _) in zip(bucket, bucket[1:]):
+            step = (next_value - value) // drift * len(partial_sums) + i
+            if best is None or step < best[0]:
+                best = (step, next_value)
+
+    return best[1] if best is not None else None
+
+
 assert apply_changes(0, [1, -2, +3, +1]) == 3
 assert apply_changes(0, [1, 1, 1]) == 3
 assert apply_changes(0, [1, 1, -2]) == 0
@@ -39,8 +101,19 @@ assert calibrate(0, [3, 3, 4, -2, -4]) == 10
 assert calibrate(0, [-6, 3, 8, 5, -6]) == 5
 assert calibrate(0, [7, 7, -2, -7, -4]) == 14
 
+assert calibrate_closed_form(0, [1, -1]) == 0
+assert calibrate_closed_form(0, [1, -2, 3, 1, 1, -2]) == 2
+assert calibrate_closed_form(0, [3, 3, 4, -2, -4]) == 10
+assert calibrate_closed_form(0, [-6, 3, 8, 5, -6]) == 5
+assert calibrate_closed_form(0, [7, 7, -2, -7, -4]) == 14
+assert calibrate_closed_form(0, [-3, -3, -4, 2, 4]) == -10
+assert calibrate_closed_form(0, [1, 1]) is None
+
+assert list(stream_changes('data/day_01.txt', chunk_size=7)) \
+    == list(stream_changes('data/day_01.txt'))
+
 changes = parse_changes('data/day_01.txt')
-print('First 5 changes:', changes[:5])
-print('Last 5 changes:', changes[-5:])
-print('Part 1:', sum(changes))
-print('Part 2:', calibrate(0, changes))
+print('First 5 changes:', changes[:5].tolist())
+print('Last 5 changes:', changes[-5:].tolist())
+print('Part 1:', sum(stream_changes('data/day_01.txt')))
+print('Part 2:', calibrate_closed_form(0, changes))
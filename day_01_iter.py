@@ -1,14 +1,14 @@
 from itertools import accumulate, chain, cycle
-from typing import Iterable, Set, Optional
+from typing import Iterable, Iterator, Set, Optional
 
 
 def parse_line(line: str) -> int:
     return int(str.strip(line))
 
 
-def parse_changes(path: str) -> Iterable[int]:
+def parse_changes(path: str) -> Iterator[int]:
     with open(path) as file:
-        return map(parse_line, file.readlines())
+        yield from map(parse_line, file)
 
 
 def prepend(value: int, iterator: Iterable[int]) -> Iterable[int]:
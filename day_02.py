@@ -1,8 +1,10 @@
-from collections import Counter
+from collections import Counter, defaultdict
 from itertools import combinations
 from functools import partial, reduce
 from operator import add as add_, mul, ne
-from typing import Iterable, List, Tuple, Optional
+from typing import Dict, Iterable, Iterator, List, Sequence, Tuple, Optional
+
+import numpy as np
 
 
 def parse_input(path: str) -> Iterable[str]:
@@ -39,6 +41,54 @@ def checksum(iterables: Iterable[Iterable]) -> int:
     return reduce(mul, has_2_has_3)
 
 
+def char_matrix(box_ids: Sequence[str]) -> np.ndarray:
+    """
+    Return a (len(box_ids), max_length) uint8 matrix of ASCII box IDs, with
+    shorter IDs padded by zero bytes.
+    """
+    encoded = np.array([box_id.encode('ascii') for box_id in box_ids],
+                       dtype=bytes)
+    width = encoded.dtype.itemsize
+    return encoded.view(np.uint8).reshape(len(box_ids), width)
+
+
+def letter_histograms(matrix: np.ndarray) -> np.ndarray:
+    """
+    Return a (rows, letters) matrix counting each letter in each row, with a
+    column for each distinct byte in the matrix, in byte order, and padding
+    bytes left out.
+    """
+    n_rows = matrix.shape[0]
+    present = np.flatnonzero(np.bincount(matrix.ravel(), minlength=256))
+    present = present[present != 0]
+
+    # Bin 0 is for padding, and is dropped at the end
+    n_bins = len(present) + 1
+    bins = np.zeros(256, dtype=np.int32)
+    bins[present] = np.arange(1, n_bins)
+
+    offsets = np.arange(n_rows, dtype=np.int32).reshape(-1, 1) * n_bins \
+        + bins[matrix]
+    counts = np.bincount(offsets.ravel(), minlength=n_rows * n_bins)
+    return counts.reshape(n_rows, n_bins)[:, 1:]
+
+
+def checksum_vectorized(box_ids: Sequence[str],
+                        chunk_size: int = 2 ** 16) -> int:
+    """
+    Checksum box IDs `chunk_size` rows at a time, so memory use doesn't grow
+    with the number of IDs.
+    """
+    has_2 = 0
+    has_3 = 0
+    for start in range(0, len(box_ids), chunk_size):
+        matrix = char_matrix(box_ids[start:(start + chunk_size)])
+        histograms = letter_histograms(matrix)
+        has_2 += int((histograms == 2).any(axis=1).sum())
+        has_3 += int((histograms == 3).any(axis=1).sum())
+    return has_2 * has_3
+
+
 def diff(x: Iterable, y: Iterable) -> Iterable:
     """
     Return an Iterable of bools, False when elements of x and y are equal.
@@ -51,10 +101,29 @@ def subtract(x: Iterable, y: Iterable) -> Iterable:
     return [xi for xi, yi in zip(x, y) if xi == yi]
 
 
-def correct(iterables: Iterable[Iterable]) -> Optional[Iterable]:
-    for x, y in combinations(iterables, 2):
-        if sum(diff(x, y)) == 1:
-            return subtract(x, y)
+def near_duplicates(box_ids: Iterable[str]) -> Iterator[Tuple[str, str]]:
+    """
+    Yield every pair of box IDs that differ in exactly one position.
+
+    Two distinct IDs differ only at position `pos` iff they're equal once `pos`
+    is cut out, so bucket the IDs by that masked key for each position.
+    """
+    # Repeated IDs would otherwise yield the same pair more than once
+    box_ids = list(dict.fromkeys(box_ids))
+    length = max(map(len, box_ids), default=0)
+    for pos in range(length):
+        buckets: Dict[str, List[str]] = defaultdict(list)
+        for box_id in box_ids:
+            if pos < len(box_id):
+                buckets[box_id[:pos] + box_id[(pos + 1):]].append(box_id)
+
+        for bucket in buckets.values():
+            yield from combinations(bucket, 2)
+
+
+def correct(iterables: Iterable[str]) -> Optional[Iterable]:
+    for x, y in near_duplicates(iterables):
+        return subtract(x, y)
 
     return None
 
@@ -92,11 +161,20 @@ assert check(box_ids_1[5]) == (1, 0)
 assert check(box_ids_1[6]) == (0, 1)
 
 assert checksum(box_ids_1) == 12
+assert checksum_vectorized(box_ids_1) == 12
+test_histograms = letter_histograms(char_matrix(['ab', 'a', 'bbz']))
+assert test_histograms.tolist() == [[1, 1, 0],
+                                    [1, 0, 0],
+                                    [0, 2, 1]]
+assert checksum_vectorized(box_ids_1, chunk_size=3) == 12
 
 assert to_str(correct(box_ids_2)) == 'fgij'
+assert list(near_duplicates(box_ids_2)) == [('fghij', 'fguij')]
+assert list(near_duplicates(['abc', 'abc', 'abd', 'xbd'])) == [('abd', 'xbd'),
+                                                               ('abc', 'abd')]
 
 inputs = parse_input('data/day_02.txt')
 print('First 5 inputs:', inputs[:5])
 print('Last 5 inputs:', inputs[-5:])
-print('Part 1:', checksum(inputs))
+print('Part 1:', checksum_vectorized(inputs))
 print('Part 2:', to_str(correct(inputs)))
@@ -2,18 +2,40 @@
 Idea:
 -----
 Build a grid in a single pass through the data:
-    Grid is a dict, mapping (x, y) co-ordinates to a list of claim IDs
+    Grid is an array of counts, sized to fit every claim, where each claim
+    adds one to its rectangle of square inches
 
-    Grid counts is a dict, mapping (x, y) co-ordinates to length of list
+Count number of elements in grid with value > 1
 
-Count number of elements in grid_counts with value > 1
+A claim is unique if no square inch in its rectangle has a count > 1
+
+Difference array
+----------------
+Rather than writing every square inch of every claim, add +1 at a claim's
+top-left corner, -1 at its top-right and bottom-left, and +1 at its
+bottom-right in a difference array. A cumsum along each axis then gives the
+grid in O(claims + area).
+
+A summed area table of (grid > 1) then tells whether any square inch of a
+claim is shared with four lookups.
+
+Sweep line
+----------
+When coordinates are too large for a dense grid, sweep a vertical line along x
+over the claims' left and right edges. A segment tree over the compressed y
+coordinates tracks how many claims cover each y interval under the line:
+    overlapping area += (length covered >= 2 times) * (distance to next edge)
+
+For unique claims, the active claims not yet known to overlap anything can't
+overlap each other, so they form disjoint y intervals that can be kept sorted
+and searched with bisect.
 """
 import re
-from collections import defaultdict
-from typing import Dict, List, NamedTuple, Set, Tuple
+from bisect import bisect_left, bisect_right, insort
+from typing import List, NamedTuple, Set, Tuple
 
+import numpy as np
 
-Point = Tuple[int, int]
 
 class Claim(NamedTuple):
     id: int
@@ -22,34 +44,198 @@ class Claim(NamedTuple):
     width: int
     height: int
 
-    def points(self) -> List[Point]:
-        return [(x, y) for x in range(self.x, self.x + self.width)
-                for y in range(self.y, self.y + self.height)]
+    def slices(self) -> Tuple[slice, slice]:
+        return (slice(self.x, self.x + self.width),
+                slice(self.y, self.y + self.height))
 
-Grid = Dict[Point, Set[int]]
+Grid = np.ndarray
 
 def build_grid(claims: List[Claim]) -> Grid:
-    grid: Grid = defaultdict(set)
+    x_max = max((claim.x + claim.width for claim in claims), default=0)
+    y_max = max((claim.y + claim.height for claim in claims), default=0)
+    grid: Grid = np.zeros((x_max, y_max), dtype=np.uint16)
 
     for claim in claims:
-        for point in claim.points():
-            grid[point].add(claim.id)
+        grid[claim.slices()] += 1
 
     return grid
 
 def shared_inches(grid: Grid) -> int:
-    return len([point for point, claim_ids in grid.items()
-                if len(claim_ids) > 1])
+    return int(np.count_nonzero(grid > 1))
 
 def unique_claims(claims: List[Claim], grid: Grid) -> List[int]:
-    unique_claim_ids = {claim.id for claim in claims}
-    for _, claim_ids in grid.items():
-        if len(claim_ids) <= 1:
+    return [claim.id for claim in claims
+            if grid[claim.slices()].max(initial=0) <= 1]
+
+
+def claim_bounds(claims: List[Claim]) -> Tuple[np.ndarray, np.ndarray,
+                                                 np.ndarray, np.ndarray]:
+    """ Return arrays of each claim's x_lo, y_lo, x_hi and y_hi."""
+    x_lo = np.array([claim.x for claim in claims], dtype=np.int64)
+    y_lo = np.array([claim.y for claim in claims], dtype=np.int64)
+    x_hi = x_lo + np.array([claim.width for claim in claims], dtype=np.int64)
+    y_hi = y_lo + np.array([claim.height for claim in claims], dtype=np.int64)
+    return x_lo, y_lo, x_hi, y_hi
+
+def build_grid_prefix(claims: List[Claim]) -> Grid:
+    x_lo, y_lo, x_hi, y_hi = claim_bounds(claims)
+    x_max = int(x_hi.max(initial=0))
+    y_max = int(y_hi.max(initial=0))
+
+    diff = np.zeros((x_max + 1, y_max + 1), dtype=np.int32)
+    np.add.at(diff, (x_lo, y_lo), 1)
+    np.add.at(diff, (x_hi, y_lo), -1)
+    np.add.at(diff, (x_lo, y_hi), -1)
+    np.add.at(diff, (x_hi, y_hi), 1)
+
+    return diff.cumsum(axis=0).cumsum(axis=1)[:x_max, :y_max]
+
+def unique_claims_prefix(claims: List[Claim], grid: Grid) -> List[int]:
+    n_x, n_y = grid.shape
+    shared = np.zeros((n_x + 1, n_y + 1), dtype=np.int64)
+    shared[1:, 1:] = (grid > 1).cumsum(axis=0).cumsum(axis=1)
+
+    x_lo, y_lo, x_hi, y_hi = claim_bounds(claims)
+    shared_in_claim = (shared[x_hi, y_hi] - shared[x_lo, y_hi]
+                       - shared[x_hi, y_lo] + shared[x_lo, y_lo])
+    return [claim.id for claim, count in zip(claims, shared_in_claim)
+            if count == 0]
+
+
+class CoverageTree:
+    """
+    Segment tree over the intervals between sorted coordinates, supporting
+    adding to a range and querying covered lengths and the max count.
+    """
+    def __init__(self, coords: List[int]):
+        self.coords = coords
+        size = 4 * max(len(coords) - 1, 1)
+        # Count of adds covering the whole node, and not passed to children
+        self.count = [0] * size
+        # Length covered at least once and at least twice within the node
+        self.covered_1 = [0] * size
+        self.covered_2 = [0] * size
+        # Max count of any interval within the node
+        self.max_count = [0] * size
+
+    def add(self, lo: int, hi: int, delta: int) -> None:
+        """ Add delta to the coordinate range [lo, hi)."""
+        self._add(1, 0, len(self.coords) - 1, lo, hi, delta)
+
+    def max(self, lo: int, hi: int) -> int:
+        """ Return the max count over the coordinate range [lo, hi)."""
+        return self._max(1, 0, len(self.coords) - 1, lo, hi)
+
+    @property
+    def overlap_length(self) -> int:
+        return self.covered_2[1]
+
+    def _add(self, node: int, left: int, right: int,
+             lo: int, hi: int, delta: int) -> None:
+        if hi <= self.coords[left] or self.coords[right] <= lo:
+            return
+        if lo <= self.coords[left] and self.coords[right] <= hi:
+            self.count[node] += delta
+        else:
+            mid = (left + right) // 2
+            self._add(2 * node, left, mid, lo, hi, delta)
+            self._add(2 * node + 1, mid, right, lo, hi, delta)
+        self._pull(node, left, right)
+
+    def _pull(self, node: int, left: int, right: int) -> None:
+        length = self.coords[right] - self.coords[left]
+        count = self.count[node]
+        if right - left == 1:
+            children_1 = children_2 = children_max = 0
+        else:
+            children_1 = (self.covered_1[2 * node]
+                          + self.covered_1[2 * node + 1])
+            children_2 = (self.covered_2[2 * node]
+                          + self.covered_2[2 * node + 1])
+            children_max = max(self.max_count[2 * node],
+                               self.max_count[2 * node + 1])
+
+        if count >= 2:
+            self.covered_1[node] = self.covered_2[node] = length
+        elif count == 1:
+            self.covered_1[node] = length
+            self.covered_2[node] = children_1
+        else:
+            self.covered_1[node] = children_1
+            self.covered_2[node] = children_2
+        self.max_count[node] = count + children_max
+
+    def _max(self, node: int, left: int, right: int, lo: int, hi: int) -> int:
+        if hi <= self.coords[left] or self.coords[right] <= lo:
+            return 0
+        if (lo <= self.coords[left] and self.coords[right] <= hi) \
+                or right - left == 1:
+            return self.max_count[node]
+        mid = (left + right) // 2
+        left_max = self._max(2 * node, left, mid, lo, hi)
+        right_max = self._max(2 * node + 1, mid, right, lo, hi)
+        return self.count[node] + max(left_max, right_max)
+
+
+Event = Tuple[int, int, int, int, int]
+
+def sweep_events(claims: List[Claim]) -> List[Event]:
+    """
+    Return (x, delta, y_lo, y_hi, index) edge events sorted by x, with claims
+    leaving before claims arriving at the same x.
+    """
+    events: List[Event] = []
+    for i, claim in enumerate(claims):
+        if claim.width and claim.height:
+            events.append((claim.x, 1, claim.y, claim.y + claim.height, i))
+            events.append((claim.x + claim.width, -1,
+                           claim.y, claim.y + claim.height, i))
+    events.sort(key=lambda event: (event[0], event[1]))
+    return events
+
+def y_coords(claims: List[Claim]) -> List[int]:
+    return sorted({y for claim in claims
+                   for y in (claim.y, claim.y + claim.height)})
+
+def shared_inches_sweep(claims: List[Claim]) -> int:
+    tree = CoverageTree(y_coords(claims))
+    area = 0
+    prev_x = 0
+    for x, delta, y_lo, y_hi, _ in sweep_events(claims):
+        area += tree.overlap_length * (x - prev_x)
+        tree.add(y_lo, y_hi, delta)
+        prev_x = x
+    return area
+
+def unique_claims_sweep(claims: List[Claim]) -> List[int]:
+    tree = CoverageTree(y_coords(claims))
+    overlapping: Set[int] = set()
+    # Active claims not yet known to overlap, as disjoint sorted
+    # (y_lo, y_hi, i)
+    disjoint: List[Tuple[int, int, int]] = []
+
+    for _, delta, y_lo, y_hi, i in sweep_events(claims):
+        if delta < 0:
+            tree.add(y_lo, y_hi, -1)
+            if i not in overlapping:
+                del disjoint[bisect_left(disjoint, (y_lo, y_hi, i))]
             continue
-        for claim_id in claim_ids:
-            unique_claim_ids.discard(claim_id)
-    return list(unique_claim_ids)
 
+        if tree.max(y_lo, y_hi) > 0:
+            overlapping.add(i)
+            # Disjoint intervals that intersect [y_lo, y_hi) are contiguous
+            start = bisect_right(disjoint, (y_lo,))
+            if start and disjoint[start - 1][1] > y_lo:
+                start -= 1
+            end = bisect_left(disjoint, (y_hi,))
+            for _, _, j in disjoint[start:end]:
+                overlapping.add(j)
+            del disjoint[start:end]
+        else:
+            insort(disjoint, (y_lo, y_hi, i))
+        tree.add(y_lo, y_hi, 1)
+
+    return [claim.id for i, claim in enumerate(claims) if i not in overlapping]
 
 pattern = re.compile('^#([0-9]+) @ ([0-9]+),([0-9]+): ([0-9]+)x([0-9]+)$')
 
@@ -73,9 +259,24 @@ test_unique_claims = unique_claims(test_claims, test_grid)
 assert shared_inches(test_grid) == 4
 assert len(test_unique_claims) == 1
 assert test_unique_claims[0] == 3
+assert shared_inches_sweep(test_claims) == 4
+assert np.array_equal(build_grid_prefix(test_claims), test_grid)
+assert unique_claims_prefix(test_claims, test_grid) == [3]
+assert unique_claims_sweep(test_claims) == [3]
+
+huge_claims = [Claim(1, 10**12, 10**12, 10**9, 10**9),
+               Claim(2, 10**12 + 10**8, 10**12, 10**9, 10**9),
+               Claim(3, 0, 0, 10**12, 10**12)]
+assert shared_inches_sweep(huge_claims) == 9 * 10**17
+assert unique_claims_sweep(huge_claims) == [3]
 
 grid = build_grid(claims)
 print(shared_inches(grid))
 unique_claims_ = unique_claims(claims, grid)
 assert len(unique_claims_) == 1
 print(unique_claims_[0])
+
+assert shared_inches_sweep(claims) == shared_inches(grid)
+assert unique_claims_sweep(claims) == unique_claims_
+assert np.array_equal(build_grid_prefix(claims), grid)
+assert unique_claims_prefix(claims, grid) == unique_claims_
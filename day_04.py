@@ -1,24 +1,25 @@
 """
 Notes:
 ------
-Build a dataframe with columns:
-    - day_of_month
-    - guard_id
-    - minute_of_midnight
-    - minutes_slept
+Build a (guard x minute_of_midnight) histogram of minutes slept, by adding +1
+at the minute each sleep starts and -1 at the minute it ends, then taking a
+cumsum along the minutes.
 Guard with most minutes slept is:
-    dataframe -> groupby(guard_id) -> sum(minutes_slept) -> argmax()
+    histogram -> sum(minutes) -> argmax()
 Minute most slept by this guard is:
-    dataframe -> filter(guard_id) -> groupby(minute_of_midnight) \
-              -> sum(minutes_slept) -> argmax()
+    histogram -> row(guard_id) -> argmax()
+Guard most frequently asleep on the same minute is:
+    histogram -> argmax()
 """
-import pandas as pd
-import re
-from collections import Counter, defaultdict
-from datetime import datetime
+import heapq
 from enum import Enum
 from typing import Dict, List, NamedTuple, Tuple, Optional
 
+import numpy as np
+
+
+MINUTES = 60
+
 
 class RecordType(Enum):
     SHIFT = 'begin_shift'
@@ -27,18 +28,35 @@ class RecordType(Enum):
 
     @classmethod
     def from_message(cls, message: str) -> 'RecordType':
-        try:
-            return {'falls asleep': RecordType.SLEEP,
-                    'wakes up': RecordType.AWAKE}[message]
-        except KeyError:
+        # 'falls asleep', 'wakes up' or 'Guard #... begins shift'
+        first = message[:1]
+        if first == 'f':
+            return RecordType.SLEEP
+        elif first == 'w':
+            return RecordType.AWAKE
+        else:
             return RecordType.SHIFT
 
 
 class Record(NamedTuple):
-    timestamp: datetime
+    # Packed as the integer YYYYMMDDHHMM, which sorts chronologically
+    timestamp: int
     type: RecordType
     guard_id: Optional[int]
 
+    @property
+    def minute(self) -> int:
+        return self.timestamp % 100
+
+
+def parse_timestamp(line: str) -> int:
+    """
+    Pack a line's [YYYY-MM-DD HH:MM] prefix into the integer YYYYMMDDHHMM.
+    """
+    if line[:1] != '[' or line[17:19] != '] ':
+        raise ValueError('Bad record', line)
+    return int(line[1:5] + line[6:8] + line[9:11] + line[12:14] + line[15:17])
+
 
 def ffill_guard_id(records: List[Record]) -> List[Record]:
     """ Forward fill guard IDs."""
@@ -54,85 +72,150 @@ def ffill_guard_id(records: List[Record]) -> List[Record]:
     return filled
 
 
-def parse_records(lines: List[str]) -> List[Record]:
-    # Pattern for parsing each record into timestamp and message
-    msg_pattern = re.compile(
-        # Timestamp: [YYYY-MM-DD HH:MM]
-        r'^\[([0-9]{4}\-[0-9]{2}\-[0-9]{2} [0-9]{2}\:[0-9]{2})\]'
-        # Message
-        r' (.+)$')
+def parse_record(line: str) -> Record:
+    line = line.strip()
 
-    # Pattern for parsing shift start messages to extract Guard ID
-    guard_id_pattern = re.compile(r'^Guard \#([0-9]+) .+$')
+    timestamp = parse_timestamp(line)
+    message = line[19:]
+    record_type = RecordType.from_message(message)
 
-    records: List[Record] = []
-    for line in lines:
-        line = line.strip()
+    if record_type is RecordType.SHIFT:
+        # 'Guard #ID begins shift'
+        guard_id = int(message[7:message.index(' ', 7)])
+    else:
+        guard_id = None
 
-        timestamp, message = re.match(msg_pattern, line).groups()
+    return Record(timestamp, record_type, guard_id)
 
-        timestamp = datetime.strptime(timestamp, '%Y-%m-%d %H:%M')
-        record_type = RecordType.from_message(message)
-
-        if record_type is RecordType.SHIFT:
-            guard_id = int(re.match(guard_id_pattern, message).groups()[0])
-        else:
-            guard_id = None
 
-        records.append(Record(timestamp, record_type, guard_id))
+def parse_records(lines: List[str]) -> List[Record]:
+    records = [parse_record(line) for line in lines]
+    timestamps = [record.timestamp for record in records]
 
-    records = sorted(records, key=lambda x: x.timestamp)
+    order = np.argsort(np.array(timestamps, dtype=np.int64), kind='stable')
+    records = [records[i] for i in order]
     records = ffill_guard_id(records)
 
     return records
 
 
-def build_records_dataframe(records: List[Record]) -> pd.DataFrame:
-    df = []
+class SleepHistogram(NamedTuple):
+    guard_ids: np.ndarray
+    minutes: np.ndarray
+
+
+def build_sleep_histogram(records: List[Record]) -> SleepHistogram:
+    guards: List[int] = []
+    starts: List[int] = []
+    ends: List[int] = []
     for record in records:
-        month = record.timestamp.month
-        day = record.timestamp.day
-        minute = record.timestamp.minute
-        guard_id = record.guard_id
+        if record.type is RecordType.SLEEP:
+            start_minute = record.minute
+
+        elif record.type is RecordType.AWAKE:
+            guards.append(record.guard_id)
+            starts.append(start_minute)
+            ends.append(record.minute)
+
+    guard_ids, rows = np.unique(np.array(guards, dtype=int),
+                                return_inverse=True)
+    diff = np.zeros((len(guard_ids), MINUTES + 1), dtype=int)
+    np.add.at(diff, (rows, starts), 1)
+    np.add.at(diff, (rows, ends), -1)
+    return SleepHistogram(guard_ids, diff.cumsum(axis=1)[:, :MINUTES])
+
+
+def _check_any_sleep(histogram: SleepHistogram) -> None:
+    if not len(histogram.guard_ids):
+        raise ValueError('No guard has slept')
+
+def guard_most_asleep(histogram: SleepHistogram) -> int:
+    _check_any_sleep(histogram)
+    return int(histogram.guard_ids[histogram.minutes.sum(axis=1).argmax()])
+
+def minute_most_asleep(histogram: SleepHistogram, guard_id: int) -> int:
+    row = np.searchsorted(histogram.guard_ids, guard_id)
+    if row == len(histogram.guard_ids) or histogram.guard_ids[row] != guard_id:
+        raise KeyError(f'Guard {guard_id} never slept')
+    return int(histogram.minutes[row].argmax())
+
+def guard_most_frequent_minute_asleep(histogram: SleepHistogram
+                                      ) -> Tuple[int, int]:
+    _check_any_sleep(histogram)
+    # Transposed so ties go to the earliest minute, then the lowest guard ID
+    minute, row = np.unravel_index(histogram.minutes.T.argmax(),
+                                   histogram.minutes.T.shape)
+    return (int(histogram.guard_ids[row]), int(minute))
+
+
+class SleepAggregator:
+    """
+    Keep a per-guard minute histogram up to date as records arrive.
+
+    Records may arrive out of order by up to `window` records: they're held
+    in a min-heap by timestamp and only applied once the heap overflows, so
+    answers reflect every record applied so far. Call `flush` once the
+    stream ends to apply the rest.
+    """
+    def __init__(self, window: int = 16):
+        self.window = window
+        self._pending: List[Tuple[int, int, Record]] = []
+        self._count = 0
+        self._last_timestamp: Optional[int] = None
+        self._guard_id: Optional[int] = None
+        self._start_minute: Optional[int] = None
+        self._minutes: Dict[int, np.ndarray] = {}
+
+    def add(self, record: Record) -> None:
+        # The count breaks timestamp ties in arrival order
+        heapq.heappush(self._pending, (record.timestamp, self._count, record))
+        self._count += 1
+        if len(self._pending) > self.window:
+            self._apply(heapq.heappop(self._pending)[2])
+
+    def add_line(self, line: str) -> None:
+        self.add(parse_record(line))
+
+    def flush(self) -> None:
+        while self._pending:
+            self._apply(heapq.heappop(self._pending)[2])
+
+    def _apply(self, record: Record) -> None:
+        if self._last_timestamp is not None \
+                and record.timestamp < self._last_timestamp:
+            raise ValueError('Record arrived too late for the reorder window',
+                             record)
+        self._last_timestamp = record.timestamp
 
         if record.type is RecordType.SHIFT:
-            continue
+            self._guard_id = record.guard_id
+            self._start_minute = None
 
         elif record.type is RecordType.SLEEP:
-            start_minute = minute
+            self._start_minute = record.minute
 
-        elif record.type is RecordType.AWAKE:
-            end_minute = minute
-            for minute_of_midnight in range(start_minute, end_minute):
-                df.append((month, day, guard_id, minute_of_midnight, 1))
-
-    df = pd.DataFrame(df, columns=['month',
-                                   'day',
-                                   'guard_id',
-                                   'minute_of_midnight',
-                                   'minutes_slept'])
-    return df
-
-
-def guard_most_asleep(df: pd.DataFrame) -> int:
-    return df.groupby('guard_id')['minutes_slept'].sum().idxmax()
-
-def minute_most_asleep(df: pd.DataFrame, guard_id: int) -> int:
-    return df.loc[df['guard_id'] == guard_id] \
-             .groupby('minute_of_midnight')['minutes_slept'] \
-             .sum().idxmax()
-
-def guard_most_frequent_minute_asleep(df: pd.DataFrame) -> Tuple[int, int]:
-    pivoted = df.pivot_table(index='guard_id',
-                             columns='minute_of_midnight',
-                             values='minutes_slept',
-                             aggfunc='sum')
-    max_ = pivoted.max().max()
-    masked = pivoted[pivoted == max_]
-    test = masked.idxmax().dropna()
-    minute = test.index[0]
-    guard_id = test.iloc[0]
-    return (guard_id, minute)
+        elif record.type is RecordType.AWAKE \
+                and self._start_minute is not None:
+            if self._guard_id not in self._minutes:
+                self._minutes[self._guard_id] = np.zeros(MINUTES, dtype=int)
+            minutes = self._minutes[self._guard_id]
+            minutes[self._start_minute:record.minute] += 1
+            self._start_minute = None
+
+    def histogram(self) -> SleepHistogram:
+        guard_ids = sorted(self._minutes)
+        minutes = [self._minutes[guard_id] for guard_id in guard_ids]
+        minutes = np.array(minutes, dtype=int).reshape(-1, MINUTES)
+        return SleepHistogram(np.array(guard_ids, dtype=int), minutes)
+
+    def guard_most_asleep(self) -> int:
+        return guard_most_asleep(self.histogram())
+
+    def minute_most_asleep(self, guard_id: int) -> int:
+        return minute_most_asleep(self.histogram(), guard_id)
+
+    def guard_most_frequent_minute_asleep(self) -> Tuple[int, int]:
+        return guard_most_frequent_minute_asleep(self.histogram())
 
 
 test_lines = """[1518-11-01 00:00] Guard #10 begins shift
@@ -153,23 +236,73 @@ test_lines = """[1518-11-01 00:00] Guard #10 begins shift
                 [1518-11-05 00:45] falls asleep
                 [1518-11-05 00:55] wakes up""".split('\n')
 test_records = parse_records(test_lines)
-test_df = build_records_dataframe(test_records)
-assert guard_most_asleep(test_df) == 10
-assert minute_most_asleep(test_df, 10) == 24
-assert guard_most_frequent_minute_asleep(test_df) == (99, 45)
+test_histogram = build_sleep_histogram(test_records)
+assert guard_most_asleep(test_histogram) == 10
+assert minute_most_asleep(test_histogram, 10) == 24
+
+# Guards who never sleep have no row, whatever their ID
+test_awake_records = parse_records(
+    test_lines + ['[1518-11-06 00:00] Guard #7 begins shift',
+                  '[1518-11-07 00:00] Guard #50 begins shift',
+                  '[1518-11-08 00:00] Guard #1000 begins shift'])
+test_awake_histogram = build_sleep_histogram(test_awake_records)
+for guard_id in (7, 50, 1000):
+    try:
+        minute_most_asleep(test_awake_histogram, guard_id)
+    except KeyError:
+        pass
+    else:
+        raise AssertionError(f'Guard {guard_id} never slept')
+assert guard_most_frequent_minute_asleep(test_histogram) == (99, 45)
+assert parse_timestamp('[1518-11-01 23:58] Guard #99 begins shift') \
+    == 151811012358
+assert test_records[5] == Record(151811012358, RecordType.SHIFT, 99)
+
+# Nobody has slept in an empty log, or before any sleep has been applied
+test_empty_histogram = build_sleep_histogram(test_records[:1])
+test_empty_aggregator = SleepAggregator()
+test_empty_aggregator.add(test_records[0])
+for answer in (lambda: guard_most_asleep(test_empty_histogram),
+               lambda: guard_most_frequent_minute_asleep(test_empty_histogram),
+               test_empty_aggregator.guard_most_asleep,
+               test_empty_aggregator.guard_most_frequent_minute_asleep):
+    try:
+        answer()
+    except ValueError:
+        pass
+    else:
+        raise AssertionError('No guard has slept')
+
+test_aggregator = SleepAggregator(window=2)
+for i in range(0, len(test_lines), 2):
+    # Swap each pair of lines so records arrive out of order
+    for line in reversed(test_lines[i:(i + 2)]):
+        test_aggregator.add_line(line)
+test_aggregator.flush()
+assert np.array_equal(test_aggregator.histogram().minutes,
+                      test_histogram.minutes)
+assert test_aggregator.guard_most_asleep() == 10
+assert test_aggregator.minute_most_asleep(10) == 24
+try:
+    test_aggregator.minute_most_asleep(50)
+except KeyError:
+    pass
+else:
+    raise AssertionError('Guard 50 never slept')
+assert test_aggregator.guard_most_frequent_minute_asleep() == (99, 45)
 
 
 if __name__ == '__main__':
     with open('data/day_04.txt') as file:
         records = parse_records(file.readlines())
-    df = build_records_dataframe(records)
-    guard_most_asleep_ = guard_most_asleep(df)
-    minute_most_slept_ = minute_most_asleep(df, guard_most_asleep_)
+    histogram = build_sleep_histogram(records)
+    guard_most_asleep_ = guard_most_asleep(histogram)
+    minute_most_slept_ = minute_most_asleep(histogram, guard_most_asleep_)
 
     print('Guard most asleep:', guard_most_asleep_)
     print('Minute most slept:', minute_most_slept_)
     print('Part 1:', guard_most_asleep_ * minute_most_slept_)
 
-    guard, minute = guard_most_frequent_minute_asleep(df)
+    guard, minute = guard_most_frequent_minute_asleep(histogram)
     print('Guard:', guard, 'most frequently asleep at minute:', minute)
     print('Part 2:', guard * minute)
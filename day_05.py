@@ -10,34 +10,113 @@ pos 3 -> do nothing
 pos 4 -> do nothing
 pos 5 -> react
 new poly input with offset = 4
+
+Stack
+-----
+Scanning left to right, a unit can only react with the last unreacted unit
+before it, so keep the unreacted units on a stack:
+    if unit reacts with top of stack -> pop
+    else                             -> push
 """
+import os
 import string
+from array import array
 from collections import Counter
-from typing import Optional, Tuple
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+from multiprocessing.shared_memory import SharedMemory
+from typing import Iterable, Optional, Tuple, Union
+
+
+# Fixed width, so workers can decode the shared buffer without a length prefix
+SHARED_ENCODING = 'utf-32-le'
+
+# Maps each ASCII byte to the byte it reacts with
+ASCII_PARTNERS = bytes.maketrans(
+    string.ascii_letters.encode('ascii'),
+    string.ascii_letters.swapcase().encode('ascii'))
+
+
+def unit_partner(unit: int) -> int:
+    """ Return the code point `unit` reacts with, or -1 if it has none."""
+    swapped = chr(unit).swapcase()
+    return ord(swapped) if len(swapped) == 1 else -1
+
+def react_units(units: Union[bytes, bytearray, array]) -> Union[bytes, array]:
+    """
+    Fully react a polymer of ASCII bytes or an array of code points, and
+    return the same kind of buffer.
+    """
+    if isinstance(units, array):
+        partner = {unit: unit_partner(unit) for unit in set(units)}
+        partners: Iterable[int] = map(partner.__getitem__, units)
+        stack = array(units.typecode)
+    else:
+        partners = bytes(units).translate(ASCII_PARTNERS)
+        stack = bytearray()
 
+    push = stack.append
+    pop = stack.pop
+    for unit, partner_unit in zip(units, partners):
+        if stack and stack[-1] == partner_unit:
+            pop()
+        else:
+            push(unit)
 
-def react(poly: str, offset: int = 1) -> Tuple[str, Optional[int]]:
-    for pos in range(offset, len(poly)):
-        prev_unit = poly[pos - 1]
-        unit = poly[pos]
-        if prev_unit.swapcase() == unit:
-            return poly[:(pos - 1)] + poly[(pos + 1):], (pos - 1)
-    return poly, None
+    return stack if isinstance(stack, array) else bytes(stack)
 
 def fully_react(poly: str) -> str:
-    prev_poly = ''
-    cur_poly = poly
-    offset = 1
-    while prev_poly != cur_poly:
-        prev_poly = cur_poly
-        cur_poly, offset = react(cur_poly, offset)
-    return cur_poly
-
-def len_shortest_polymer(poly: str) -> Tuple[str, int]:
+    if poly.isascii():
+        return react_units(poly.encode('ascii')).decode('ascii')
+    return ''.join(map(chr, react_units(array('I', map(ord, poly)))))
+
+def removed_length(poly: str, letter: str) -> int:
+    removed_poly = poly.replace(letter, '').replace(letter.swapcase(), '')
+    return len(fully_react(removed_poly))
+
+def _shared_removed_length(name: str, size: int, letter: str) -> int:
+    shared = SharedMemory(name=name)
+    try:
+        poly = bytes(shared.buf[:size]).decode(SHARED_ENCODING)
+    finally:
+        shared.close()
+    return removed_length(poly, letter)
+
+def len_shortest_polymer(poly: str,
+                         alphabet: Iterable[str] = string.ascii_lowercase,
+                         workers: Optional[int] = None) -> Tuple[str, int]:
+    """
+    Return the letter whose removal gives the shortest reacted polymer, and
+    that polymer's length.
+
+    If `workers` is given, letters are evaluated in a process pool of that
+    size, with the polymer shared through shared memory.
+    """
+    # Removing a letter never stops the remaining units from reacting, so
+    # start from the already reacted polymer
+    reacted_poly = fully_react(poly)
+    alphabet = list(alphabet)
     reacted_poly_lengths: Counter = Counter()
-    for letter in string.ascii_lowercase:
-        removed_poly = poly.replace(letter, '').replace(letter.upper(), '')
-        reacted_poly_lengths[letter] = len(fully_react(removed_poly))
+
+    if workers is None:
+        for letter in alphabet:
+            reacted_poly_lengths[letter] = removed_length(reacted_poly, letter)
+        return reacted_poly_lengths.most_common()[-1]
+
+    encoded = reacted_poly.encode(SHARED_ENCODING)
+    shared = SharedMemory(create=True, size=max(len(encoded), 1))
+    try:
+        shared.buf[:len(encoded)] = encoded
+        with ProcessPoolExecutor(workers) as pool:
+            lengths = pool.map(_shared_removed_length,
+                               repeat(shared.name),
+                               repeat(len(encoded)),
+                               alphabet)
+            for letter, length in zip(alphabet, lengths):
+                reacted_poly_lengths[letter] = length
+    finally:
+        shared.close()
+        shared.unlink()
     return reacted_poly_lengths.most_common()[-1]
 
 
@@ -45,13 +124,23 @@ test_polymer = 'dabAcCaCBAcCcaDa'
 test_reacted = fully_react(test_polymer)
 
 assert len(test_reacted) == 10
+assert react_units(test_polymer.encode('ascii')) == b'dabCBAcaDa'
+assert react_units(array('I', map(ord, 'aßAaSSs'))) \
+    == array('I', map(ord, 'aßS'))
 assert len_shortest_polymer(test_polymer) == ('c', 4)
+assert len_shortest_polymer('αβΒΑγαΓ', alphabet='αβγ') == ('α', 0)
 
 
 if __name__ == '__main__':
+    # Pools can't be used while this module is being imported, since pickling
+    # their tasks waits on the import lock
+    assert len_shortest_polymer(test_polymer, workers=2) == ('c', 4)
+    assert len_shortest_polymer('αβΒΑγαΓ', alphabet='αβγ',
+                                workers=2) == ('α', 0)
+
     with open('data/day_05.txt') as file:
         polymer = file.read().strip()
 
     reacted = fully_react(polymer)
     print(len(reacted))
-    print(len_shortest_polymer(polymer))
+    print(len_shortest_polymer(polymer, workers=os.cpu_count()))
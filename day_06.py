@@ -20,12 +20,39 @@ How to build the grid?
      - Calculate manhatten distance to each co-ordinate
      - Take min distance's letter
 
+Vectorized
+----------
+Label the same grid as an array of coord indices (-1 for ties), computing the
+distances from a band of rows to every coord as one broadcast
+    |x - coord_x| + |y - coord_y|    shape (rows, columns, coords)
+with the band height chosen to bound the size of that array.
+
 Part 2
 ------
 Build a different grid?
+
+The total distance splits into an x part and a y part:
+    total(x, y) = sum(|x - coord_x|) + sum(|y - coord_y|) = X(x) + Y(y)
+so compute X and Y for each column and row once, with prefix sums over the
+sorted coord xs and ys. Then the region size is the number of (X, Y) pairs
+with X + Y < threshold: for each X, a binary search over the sorted Ys.
+
+Both X and Y grow by at least len(coords) per step away from the coords, so
+the region can't reach more than threshold // len(coords) past them.
+
+Tiled
+-----
+For very large inputs, split the box into bands of rows and evaluate each
+band in a process pool. A band only sends back per-coord area counts, which
+coords reach the edge of the box, and its count of safe points, so no
+per-point grid is ever built. Areas that reach the edge are infinite.
 """
+import os
 from collections import Counter
-from typing import Dict, List, Set, Tuple
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterator, List, NamedTuple, Optional, Set, Tuple
+
+import numpy as np
 
 
 Point = Tuple[int, int]
@@ -50,28 +77,78 @@ def manhatten(point1: Point, point2: Point) -> int:
     x2, y2 = point2
     return abs(x2 - x1) + abs(y2 - y1)
 
-def build_grid(coords: List[Point]) -> Grid:
+def label_grid(coords: List[Point], max_cells: int = 2 ** 22) -> np.ndarray:
+    """
+    Return an array of the index of the closest coord to each point, or -1 if
+    more than one coord is equally close. Element [i, j] is the point
+    (x_min - 1 + i, y_min - 1 + j).
+
+    The box is processed in tiles of at most `max_cells` (row, column, coord)
+    distances at a time, or a single point's distances if there are more
+    coords than that.
+    """
     (x_min, y_min), (x_max, y_max) = grid_bounds(coords)
+    coord_xs = np.array([x for x, _ in coords])
+    coord_ys = np.array([y for _, y in coords])
+
+    # One to the left of the min and one to the right of the max
+    xs = np.arange(x_min - 1, x_max + 2)
+    ys = np.arange(y_min - 1, y_max + 2)
+
+    labels = np.empty((len(xs), len(ys)), dtype=np.int32)
+    for rows, columns in tiles(len(xs), len(ys), len(coords), max_cells):
+        dists = band_distances(xs[rows], ys[columns], coord_xs, coord_ys)
+        labels[rows, columns] = closest_labels(dists)
+
+    return labels
+
+def tiles(n_rows: int,
+          n_columns: int,
+          n_coords: int,
+          max_cells: int) -> Iterator[Tuple[slice, slice]]:
+    """
+    Yield (rows, columns) slices covering an n_rows x n_columns box, with each
+    tile holding at most `max_cells` distances to `n_coords` coords, and at
+    least one point.
+    """
+    tile_columns = min(n_columns, max(1, max_cells // n_coords))
+    tile_rows = max(1, max_cells // (tile_columns * n_coords))
+    for row in range(0, n_rows, tile_rows):
+        for column in range(0, n_columns, tile_columns):
+            yield (slice(row, row + tile_rows),
+                   slice(column, column + tile_columns))
+
+def band_distances(xs: np.ndarray, ys: np.ndarray,
+                   coord_xs: np.ndarray, coord_ys: np.ndarray) -> np.ndarray:
+    """ Return the (len(xs), len(ys), coords) array of Manhattan distances."""
+    x_dists = np.abs(xs.reshape(-1, 1) - coord_xs)
+    y_dists = np.abs(ys.reshape(-1, 1) - coord_ys)
+    return x_dists[:, np.newaxis, :] + y_dists[np.newaxis, :, :]
+
+def closest_labels(dists: np.ndarray) -> np.ndarray:
+    closest = dists.argmin(axis=2)
+    min_dists = np.take_along_axis(dists, closest[..., np.newaxis], axis=2)
+    # If more than one coord are equally close then there's no label
+    ties = (dists == min_dists).sum(axis=2) > 1
+    return np.where(ties, -1, closest)
 
-    # Start one to the left of x_min and end one to the right of x_max
-    grid: Grid = {}
-    for x in range(x_min - 1, x_max + 2):
-        # Start one to the left of y_min and end one to the right of y_max
-        for y in range(y_min - 1, y_max + 2):
-            point = (x, y)
-            dists = [manhatten(point, coord) for coord in coords]
-            min_dist = min(dists)
+def build_grid(coords: List[Point]) -> Grid:
+    (x_min, y_min), _ = grid_bounds(coords)
+    labels = label_grid(coords)
+    return {(x_min - 1 + i, y_min - 1 + j): coords[label]
+            for (i, j), label in np.ndenumerate(labels) if label >= 0}
+
+def largest_finite_area(coords: List[Point]) -> Tuple[Point, int]:
+    """ Return the coord with the largest finite area, and that area."""
+    labels = label_grid(coords)
+    areas = np.bincount(labels[labels >= 0], minlength=len(coords))
 
-            closest_coord_idx = dists.index(min_dist)
-            closest_coord = coords[closest_coord_idx]
-            # If more than one coord are equally close then don't set grid val
-            dists.pop(closest_coord_idx)
-            try:
-                dists.index(min_dist)
-            except ValueError:
-                grid[point] = closest_coord
+    edges = np.concatenate([labels[0], labels[-1],
+                            labels[:, 0], labels[:, -1]])
+    areas[edges[edges >= 0]] = 0
 
-    return grid
+    best = int(areas.argmax())
+    return coords[best], int(areas[best])
 
 def boundary_points(grid: Grid, coords: List[Point]) -> List[Point]:
     """ Return points on the boundary of a grid, not necessarily sorted."""
@@ -120,6 +197,118 @@ def build_safe_region(coords: List[Point], threshold: int = 10_000) -> Set[Point
     return region
 
 
+def axis_distances(values: np.ndarray, positions: np.ndarray) -> np.ndarray:
+    """ Return the sum of |position - value| over values, for each position."""
+    values = np.sort(values)
+    prefix = np.concatenate([[0], values.cumsum()])
+    below = np.searchsorted(values, positions)
+    above = len(values) - below
+    return (positions * below - prefix[below]) \
+        + (prefix[-1] - prefix[below]) - positions * above
+
+def safe_region_size(coords: List[Point], threshold: int = 10_000) -> int:
+    (x_min, y_min), (x_max, y_max) = grid_bounds(coords)
+    margin = threshold // len(coords) + 1
+
+    coord_xs = np.array([x for x, _ in coords], dtype=np.int64)
+    coord_ys = np.array([y for _, y in coords], dtype=np.int64)
+    xs = np.arange(x_min - margin, x_max + margin + 1, dtype=np.int64)
+    ys = np.arange(y_min - margin, y_max + margin + 1, dtype=np.int64)
+
+    x_dists = axis_distances(coord_xs, xs)
+    y_dists = np.sort(axis_distances(coord_ys, ys))
+
+    x_dists = x_dists[x_dists < threshold]
+    return int(np.searchsorted(y_dists, threshold - x_dists).sum())
+
+
+class BandResult(NamedTuple):
+    areas: np.ndarray
+    on_edge: np.ndarray
+    safe_size: int
+
+
+def evaluate_band(coord_xs: np.ndarray,
+                  coord_ys: np.ndarray,
+                  x_range: Tuple[int, int],
+                  box: Tuple[Point, Point],
+                  threshold: int,
+                  max_cells: int) -> BandResult:
+    """ Evaluate the rows x_range[0] <= x < x_range[1] of the box."""
+    (box_x_min, box_y_min), (box_x_max, box_y_max) = box
+    ys = np.arange(box_y_min, box_y_max + 1)
+
+    areas = np.zeros(len(coord_xs), dtype=np.int64)
+    on_edge = np.zeros(len(coord_xs), dtype=bool)
+    safe_size = 0
+
+    band_xs = np.arange(x_range[0], x_range[1])
+    for rows, columns in tiles(len(band_xs), len(ys), len(coord_xs),
+                               max_cells):
+        xs = band_xs[rows]
+        dists = band_distances(xs, ys[columns], coord_xs, coord_ys)
+        labels = closest_labels(dists)
+
+        areas += np.bincount(labels[labels >= 0], minlength=len(coord_xs))
+        edges = []
+        if xs[0] == box_x_min:
+            edges.append(labels[0])
+        if xs[-1] == box_x_max:
+            edges.append(labels[-1])
+        if columns.start == 0:
+            edges.append(labels[:, 0])
+        if columns.stop >= len(ys):
+            edges.append(labels[:, -1])
+        if edges:
+            edges = np.concatenate(edges)
+            on_edge[edges[edges >= 0]] = True
+
+        safe_size += int(np.count_nonzero(dists.sum(axis=2) < threshold))
+
+    return BandResult(areas, on_edge, safe_size)
+
+
+def evaluate_tiled(coords: List[Point],
+                   threshold: int = 10_000,
+                   band_rows: int = 64,
+                   workers: Optional[int] = None,
+                   max_cells: int = 2 ** 22) -> BandResult:
+    """
+    Evaluate both parts over the box around the coords, in bands of
+    `band_rows` rows, using a process pool of `workers` if given.
+
+    The box extends far enough past the coords to hold the whole safe region.
+    """
+    (x_min, y_min), (x_max, y_max) = grid_bounds(coords)
+    margin = max(1, threshold // len(coords) + 1)
+    box = ((x_min - margin, y_min - margin), (x_max + margin, y_max + margin))
+
+    coord_xs = np.array([x for x, _ in coords], dtype=np.int64)
+    coord_ys = np.array([y for _, y in coords], dtype=np.int64)
+    x_ranges = [(start, min(start + band_rows, box[1][0] + 1))
+                for start in range(box[0][0], box[1][0] + 1, band_rows)]
+    args = [(coord_xs, coord_ys, x_range, box, threshold, max_cells)
+            for x_range in x_ranges]
+
+    if workers is None:
+        results = [evaluate_band(*arg) for arg in args]
+    else:
+        with ProcessPoolExecutor(workers) as pool:
+            results = list(pool.map(evaluate_band, *zip(*args)))
+
+    areas = sum(result.areas for result in results)
+    on_edge = np.logical_or.reduce([result.on_edge for result in results])
+    safe_size = sum(result.safe_size for result in results)
+    return BandResult(areas, on_edge, safe_size)
+
+
+def largest_finite_area_tiled(result: BandResult,
+                              coords: List[Point]) -> Tuple[Point, int]:
+    areas = np.where(result.on_edge, 0, result.areas)
+    best = int(areas.argmax())
+    return coords[best], int(areas[best])
+
+
 test_coords = [(1, 1),    # A
                (1, 6),    # B
                (8, 3),    # C
@@ -136,26 +325,51 @@ test_largest_finite_area = test_finite_area_counts.most_common(1)[0]
 assert test_counts[(3, 4)] == 9
 assert test_counts[(5, 5)] == 17
 assert test_largest_finite_area == ((5, 5), 17)
+assert largest_finite_area(test_coords) == ((5, 5), 17)
+assert np.array_equal(label_grid(test_coords, max_cells=1),
+                      label_grid(test_coords))
+# Wider than a tile, so rows are split into column tiles too
+test_wide_coords = test_coords + [(2, 200), (7, -150)]
+assert np.array_equal(label_grid(test_wide_coords, max_cells=64),
+                      label_grid(test_wide_coords))
 test_safe_region = build_safe_region(test_coords, 32)
 assert len(test_safe_region) == 16
+assert safe_region_size(test_coords, 32) == 16
+# A single coord's region is a diamond, which build_safe_region truncates
+assert safe_region_size([(0, 0)], 3) == 13
+
+test_tiled = evaluate_tiled(test_coords, 32, band_rows=3, max_cells=20)
+assert largest_finite_area_tiled(test_tiled, test_coords) == ((5, 5), 17)
+assert {coord for coord, on_edge in zip(test_coords, test_tiled.on_edge)
+        if not on_edge} == test_finite_area_coords
+assert test_tiled.safe_size == 16
+
+test_wide_tiled = evaluate_tiled(test_wide_coords, 400, band_rows=4,
+                                 max_cells=64)
+test_wide_serial = evaluate_tiled(test_wide_coords, 400)
+assert np.array_equal(test_wide_tiled.areas, test_wide_serial.areas)
+assert np.array_equal(test_wide_tiled.on_edge, test_wide_serial.on_edge)
+assert test_wide_tiled.safe_size == test_wide_serial.safe_size
 
 
 if __name__ == '__main__':
+    # Pools can't be used while this module is being imported, since pickling
+    # their tasks waits on the import lock
+    test_pool_tiled = evaluate_tiled(test_wide_coords, 400, band_rows=4,
+                                     workers=2, max_cells=64)
+    assert np.array_equal(test_pool_tiled.areas, test_wide_serial.areas)
+    assert np.array_equal(test_pool_tiled.on_edge, test_wide_serial.on_edge)
+    assert test_pool_tiled.safe_size == test_wide_serial.safe_size
+
     with open('data/day_06.txt') as f:
         coords = []
         for line in f.readlines():
             x, y = line.strip().split(', ')
             coords.append((int(x), int(y)))
 
-    grid = build_grid(coords)
-    # grid = finite_area_grid(grid)
-    counts = Counter(grid.values())
-    finite_area_coords_ = finite_area_coords(grid, coords)
-
-    finite_area_counts = Counter({coord: count for coord, count in counts.items()
-                                  if coord in finite_area_coords_})
-
-    largest_finite_area = finite_area_counts.most_common(1)[0]
+    print(largest_finite_area(coords))
+    print(safe_region_size(coords, 10_000))
 
-    print(largest_finite_area)
-    print(len(build_safe_region(coords, 10_000)))
+    tiled = evaluate_tiled(coords, 10_000, workers=os.cpu_count())
+    print(largest_finite_area_tiled(tiled, coords))
+    print(tiled.safe_size)
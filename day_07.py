@@ -28,6 +28,13 @@ Loop:
             Remove scheduled_node from their prev
     Update list of available - all nodes with no prev
 
+Heap
+----
+Rather than rescanning every node for leaves after each step, keep a count
+of each node's unfinished pre-requisites and a min-heap of nodes whose count
+is zero. Scheduling a node decrements the counts of its next nodes, pushing
+any that reach zero.
+
 Part 2
 ------
 A worker is an object that either points to a Node or points to nothing (idle)
@@ -40,11 +47,25 @@ Main Loop:
         complete 1 second of work
 
         if no seconds of work left, make idle
+
+Nothing changes between one job finishing and the next, so instead keep the
+running jobs in a min-heap by finish time and jump straight to the next one.
+
+Graph
+-----
+To run many scenarios against one graph, build it once as flat tuples of
+costs, pre-requisite counts and CSR-style next node lists, over integer node
+IDs. Each run only copies the pre-requisite counts.
 """
+import heapq
+import os
 import re
-from copy import deepcopy
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
 from string import ascii_uppercase
-from typing import Dict, List, Set
+from typing import (Callable, Dict, Iterable, List, NamedTuple, Optional, Set,
+                    Tuple)
 
 
 LETTER_COST = {letter: (i + 1) for i, letter in enumerate(ascii_uppercase)}
@@ -54,9 +75,11 @@ class Node:
     def __init__(self,
                  name: str,
                  prev: Set[str] = None,
-                 next: Set[str] = None):
+                 next: Set[str] = None,
+                 cost: int = None):
         self.name = name
-        self.cost = LETTER_COST[name]
+        # Steps not named by a single letter cost 1 unless given a cost
+        self.cost = cost if cost is not None else LETTER_COST.get(name, 1)
         self.prev = prev if prev is not None else set()
         self.next = next if next is not None else set()
 
@@ -66,15 +89,10 @@ class Node:
                f'prev={self.prev},' \
                f'next={self.next})'
 
-    def update(self):
-        self.cost -= 1
-        if self.cost < 0:
-            raise RuntimeError('cost must not be less than zero')
-
 
 def parse_nodes(lines: List[str]) -> Dict[str, Node]:
     pattern = re.compile(
-        r'^Step ([A-Z]) must be finished before step ([A-Z]) can begin.$')
+        r'^Step (\S+) must be finished before step (\S+) can begin.$')
     nodes: Dict[str, Node] = {}
     for line in lines:
         req, target = re.match(pattern, line.strip()).groups()
@@ -94,94 +112,219 @@ def leaf_nodes(nodes: Dict[str, Node]) -> List[str]:
     return [name for name, node in nodes.items() if not node.prev]
 
 
-def schedule_nodes(nodes: Dict[str, Node]) -> List[str]:
-    nodes = deepcopy(nodes)
+class TaskGraph(NamedTuple):
+    """
+    Immutable graph with nodes numbered in name order, so that comparing IDs
+    compares names. The next nodes of node i are
+    next_ids[next_offsets[i]:next_offsets[i + 1]].
+    """
+    names: Tuple[str, ...]
+    costs: Tuple[int, ...]
+    num_prev: Tuple[int, ...]
+    next_offsets: Tuple[int, ...]
+    next_ids: Tuple[int, ...]
+
+
+def build_graph(nodes: Dict[str, Node]) -> TaskGraph:
+    names = tuple(sorted(nodes))
+    ids = {name: id for id, name in enumerate(names)}
+
+    next_offsets = [0]
+    next_ids: List[int] = []
+    for name in names:
+        next_ids.extend(sorted(ids[next_name]
+                               for next_name in nodes[name].next))
+        next_offsets.append(len(next_ids))
+
+    return TaskGraph(names,
+                     tuple(nodes[name].cost for name in names),
+                     tuple(len(nodes[name].prev) for name in names),
+                     tuple(next_offsets),
+                     tuple(next_ids))
+
+
+def parse_graph(lines: List[str]) -> TaskGraph:
+    return build_graph(parse_nodes(lines))
+
+
+def schedule_graph(graph: TaskGraph) -> List[str]:
+    num_prev = array('l', graph.num_prev)
+    available = [id for id, count in enumerate(num_prev) if not count]
+
     schedule = []
-    available = sorted(leaf_nodes(nodes))
     while available:
-        scheduled = available[0]
-        scheduled_node = nodes.pop(scheduled)
+        scheduled = heapq.heappop(available)
 
-        for name in scheduled_node.next:
-            node = nodes[name]
-            node.prev.discard(scheduled)
+        start = graph.next_offsets[scheduled]
+        end = graph.next_offsets[scheduled + 1]
+        for id in graph.next_ids[start:end]:
+            num_prev[id] -= 1
+            if not num_prev[id]:
+                heapq.heappush(available, id)
 
-        available = sorted(leaf_nodes(nodes))
-
-        schedule.append(scheduled)
+        schedule.append(graph.names[scheduled])
 
     return schedule
 
 
-def multi_schedule_nodes(nodes: Dict[str, Node],
-                         num_workers: int,
-                         base_cost: int) -> int:
-
-    for _, node in nodes.items():
-        node.cost += base_cost
+def schedule_nodes(nodes: Dict[str, Node]) -> List[str]:
+    return schedule_graph(build_graph(nodes))
 
-    workers = [id for id in range(num_workers)]
-    jobs = {id: None for id in workers}
 
-    available = sorted(leaf_nodes(nodes))
+def multi_schedule_graph(graph: TaskGraph,
+                         num_workers: int,
+                         base_cost: int,
+                         trace: Optional[Callable[[str], None]] = None) -> int:
+    """
+    Return the time taken for `num_workers` workers to complete every node.
+
+    If given, `trace` is called with a header and then one line of worker
+    jobs at each time a job completes.
+    """
+    return _simulate(graph, num_workers, base_cost, trace)[0]
+
+
+def _simulate(graph: TaskGraph,
+              num_workers: int,
+              base_cost: int,
+              trace: Optional[Callable[[str], None]] = None
+              ) -> Tuple[int, bool]:
+    """
+    Return the time taken, and whether any available node ever had to wait
+    for a worker.
+    """
+    if num_workers < 1:
+        raise ValueError(f'num_workers must be at least 1, got {num_workers}')
+
+    num_prev = array('l', graph.num_prev)
+    available = [id for id, count in enumerate(num_prev) if not count]
+    idle_workers = list(range(num_workers))
+    # (finish_time, worker, node ID) for each running job
+    running: List[Tuple[int, int, int]] = []
+    jobs: List[Optional[int]] = [None] * num_workers
     done: List[str] = []
+    num_done = 0
     time = 0
+    waited = False
 
-    msg = 'Second  '
-    for id in workers:
-        msg += f'Worker {id}  '
-    msg += 'Done'
-    print(msg)
+    if trace is not None:
+        msg = 'Second  '
+        for id in range(num_workers):
+            msg += f'Worker {id}  '
+        msg += 'Done'
+        trace(msg)
 
     while True:
-        # Schedule jobs to idle workers
-        idle_workers = [id for id, node in jobs.items() if node is None]
-        for worker in idle_workers:
-            if not available:
-                break
-            jobs[worker] = available.pop(0)
-
-        # Logging
-        msg = f'{time:4d}    '
-        sorted_job_nodes = [jobs[id] for id in workers]
-        for node in sorted_job_nodes:
-            if node is None:
-                node = '.'
-            msg += f' {node:^8} '
-        done_str = ''.join(done)
-        msg += done_str
-        print(msg)
-
-        if not nodes:
+        # Schedule jobs to idle workers, lowest IDs first
+        while idle_workers and available:
+            worker = heapq.heappop(idle_workers)
+            id = heapq.heappop(available)
+            jobs[worker] = id
+            heapq.heappush(running, (time + graph.costs[id] + base_cost,
+                                     worker, id))
+        waited = waited or bool(available)
+
+        if trace is not None:
+            msg = f'{time:4d}    '
+            for id in jobs:
+                name = '.' if id is None else graph.names[id]
+                msg += f' {name:^8} '
+            msg += ''.join(done)
+            trace(msg)
+
+        if not running:
             break
 
-        # Apply work: reduce each job node's cost by 1
-        active_workers = [id for id, node in jobs.items() if node is not None]
-        for worker in active_workers:
-            name = jobs[worker]
-            node = nodes[name]
-            node.update()
+        # Jump to the next completion, and complete every job finishing then
+        time = running[0][0]
+        while running and running[0][0] == time:
+            _, worker, id = heapq.heappop(running)
+            jobs[worker] = None
+            heapq.heappush(idle_workers, worker)
+            num_done += 1
+            if trace is not None:
+                done.append(graph.names[id])
 
-            # If node is completed, update graph
-            if node.cost == 0:
-                # Set worker to idle
-                jobs[worker] = None
-                # Remove this node from the list
-                nodes.pop(name)
-                done.append(name)
-                # Remove this node from next node's state
-                for next_name in node.next:
-                    next_node = nodes[next_name]
-                    next_node.prev.discard(name)
+            start = graph.next_offsets[id]
+            end = graph.next_offsets[id + 1]
+            for next_id in graph.next_ids[start:end]:
+                num_prev[next_id] -= 1
+                if not num_prev[next_id]:
+                    heapq.heappush(available, next_id)
 
-        scheduled = jobs.values()
-        available = [name for name in sorted(leaf_nodes(nodes))
-                     if name not in scheduled]
-        # print(nodes)
+    if num_done != len(graph.names):
+        num_left = len(graph.names) - num_done
+        raise ValueError('Graph has a cycle, '
+                         f'{num_left} nodes could not be done')
 
-        time += 1
+    return time, waited
 
-    return time
+
+def multi_schedule_nodes(nodes: Dict[str, Node],
+                         num_workers: int,
+                         base_cost: int,
+                         trace: Optional[Callable[[str], None]] = None) -> int:
+    return multi_schedule_graph(build_graph(nodes), num_workers, base_cost,
+                                trace)
+
+
+# Set in each sweep worker process, so the graph is only sent once per process
+_sweep_graph: Optional[TaskGraph] = None
+
+
+def _set_sweep_graph(graph: TaskGraph) -> None:
+    global _sweep_graph
+    _sweep_graph = graph
+
+
+def _sweep_worker_counts(worker_counts: List[int],
+                         base_cost: int,
+                         graph: Optional[TaskGraph] = None
+                         ) -> Dict[Tuple[int, int], int]:
+    graph = graph if graph is not None else _sweep_graph
+    makespans: Dict[Tuple[int, int], int] = {}
+    for i, num_workers in enumerate(worker_counts):
+        time, waited = _simulate(graph, num_workers, base_cost)
+        makespans[(num_workers, base_cost)] = time
+        # If no node ever waited for a worker, more workers can't help
+        if not waited:
+            for more_workers in worker_counts[(i + 1):]:
+                makespans[(more_workers, base_cost)] = time
+            break
+    return makespans
+
+
+def sweep_makespans(graph: TaskGraph,
+                    worker_counts: Iterable[int],
+                    base_costs: Iterable[int],
+                    workers: Optional[int] = None
+                    ) -> Dict[Tuple[int, int], int]:
+    """
+    Return the time taken for every (num_workers, base_cost) combination.
+
+    Each base cost is swept over the worker counts in increasing order, in a
+    process pool of `workers` if given, and stops simulating once no node
+    has to wait for a worker.
+    """
+    worker_counts = sorted(set(worker_counts))
+    if worker_counts and worker_counts[0] < 1:
+        raise ValueError('Worker counts must be at least 1, '
+                         f'got {worker_counts[0]}')
+    base_costs = list(base_costs)
+
+    makespans: Dict[Tuple[int, int], int] = {}
+    if workers is None:
+        for base_cost in base_costs:
+            makespans.update(_sweep_worker_counts(worker_counts, base_cost,
+                                                  graph))
+    else:
+        with ProcessPoolExecutor(workers,
+                                 initializer=_set_sweep_graph,
+                                 initargs=(graph,)) as pool:
+            for result in pool.map(_sweep_worker_counts,
+                                   repeat(worker_counts), base_costs):
+                makespans.update(result)
+    return makespans
 
 
 test_lines = """Step C must be finished before step A can begin.
@@ -194,10 +337,67 @@ test_lines = """Step C must be finished before step A can begin.
 test_nodes = parse_nodes(test_lines)
 assert leaf_nodes(test_nodes) == ['C']
 assert ''.join(schedule_nodes(test_nodes)) == 'CABDFE'
+assert schedule_nodes(parse_nodes([
+    'Step task10 must be finished before step task2 can begin.',
+    'Step task1 must be finished before step task2 can begin.'])) \
+    == ['task1', 'task10', 'task2']
 assert multi_schedule_nodes(test_nodes, 2, 0) == 15
+# Nodes aren't modified, so scenarios can be run one after another
+assert multi_schedule_nodes(test_nodes, 2, 0) == 15
+assert multi_schedule_nodes(test_nodes, 2, 10**9) == 4 * 10**9 + 18
+
+test_graph = parse_graph(test_lines)
+assert test_graph.names == ('A', 'B', 'C', 'D', 'E', 'F')
+assert list(test_graph.next_ids) == [1, 3, 4, 0, 5, 4, 4]
+assert list(test_graph.next_offsets) == [0, 2, 3, 5, 6, 6, 7]
+assert ''.join(schedule_graph(test_graph)) == 'CABDFE'
+assert [multi_schedule_graph(test_graph, workers, 0)
+        for workers in (1, 2, 3)] == [21, 15, 14]
+
+test_sweep = sweep_makespans(test_graph, range(1, 6), [0, 60])
+assert test_sweep == {(workers, base_cost): multi_schedule_graph(test_graph,
+                                                                 workers,
+                                                                 base_cost)
+                      for workers in range(1, 6) for base_cost in [0, 60]}
+
+for num_workers in (0, -1):
+    try:
+        multi_schedule_graph(test_graph, num_workers, 0)
+    except ValueError:
+        pass
+    else:
+        raise AssertionError('num_workers must be at least 1')
+
+test_cyclic_graph = parse_graph(test_lines + [
+    'Step E must be finished before step C can begin.'])
+try:
+    multi_schedule_graph(test_cyclic_graph, 2, 0)
+except ValueError:
+    pass
+else:
+    raise AssertionError('Graph has a cycle')
+try:
+    sweep_makespans(test_graph, range(0, 3), [0])
+except ValueError:
+    pass
+else:
+    raise AssertionError('Worker counts must be at least 1')
+
+test_trace: List[str] = []
+multi_schedule_nodes(test_nodes, 2, 0, trace=test_trace.append)
+assert test_trace[-1].split() == ['15', '.', '.', 'CABFDE']
 
 if __name__ == '__main__':
+    # Pools can't be used while this module is being imported, since pickling
+    # their tasks waits on the import lock
+    assert sweep_makespans(test_graph, range(1, 6), [0, 60], workers=2) \
+        == test_sweep
+
     with open('data/day_07.txt') as f:
-        nodes = parse_nodes(f.readlines())
-    print(''.join(schedule_nodes(nodes)))
-    print(multi_schedule_nodes(nodes, 5, 60))
+        graph = parse_graph(f.readlines())
+    print(''.join(schedule_graph(graph)))
+    print(multi_schedule_graph(graph, 5, 60, trace=print))
+
+    makespans = sweep_makespans(graph, range(1, 27), range(0, 121, 10),
+                                workers=os.cpu_count())
+    print(makespans[(5, 60)])
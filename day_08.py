@@ -11,10 +11,17 @@ e.g [2, 3, ...]
      |  |
      |  ----> Number of metadata entries
      -------> Number of children
+
+Flat
+----
+Nodes finish parsing in post-order, so numbering them as they finish puts
+every child before its parent. Store the tree as arrays indexed by that
+number, and each node's value can be computed in one forward pass.
 """
+from array import array
 from operator import add
 from functools import reduce
-from typing import List, NamedTuple
+from typing import List, NamedTuple, Sequence
 
 
 class Node(NamedTuple):
@@ -22,26 +29,30 @@ class Node(NamedTuple):
     metadata: List[int]
 
 
-def parse_nums(nums: List[int]) -> Node:
-    nodes = _parse_nums(nums)
-    return nodes[0].children[0]
-
-
-def _parse_nums(nums: List[int],
-                num_children: int = 1,
-                num_metadata: int = 0):
-    children = []
-    for _ in range(num_children):
-        child_num_children = nums[0]
-        child_num_metadata = nums[1]
-        nums = nums[2:]
-        child_node, nums = _parse_nums(nums, child_num_children, child_num_metadata)
-        children.append(child_node)
-
-    metadata = nums[:num_metadata]
-    nums = nums[num_metadata:]
-
-    return Node(children, metadata), nums
+def parse_nums(nums: Sequence[int]) -> Node:
+    """
+    Parse a tree by walking a cursor over `nums`, keeping the nodes still
+    waiting for children on an explicit stack.
+    """
+    # Each frame is [children left to parse, num metadata, children so far]
+    stack: List[list] = [[nums[0], nums[1], []]]
+    pos = 2
+    while True:
+        frame = stack[-1]
+        if frame[0]:
+            frame[0] -= 1
+            stack.append([nums[pos], nums[pos + 1], []])
+            pos += 2
+            continue
+
+        stack.pop()
+        _, num_metadata, children = frame
+        node = Node(children, list(nums[pos:(pos + num_metadata)]))
+        pos += num_metadata
+
+        if not stack:
+            return node
+        stack[-1][2].append(node)
 
 
 def get_metadata(node: Node) -> List[int]:
@@ -63,6 +74,77 @@ def get_value(node: Node) -> int:
         return sum(node.metadata)
 
 
+class FlatTree(NamedTuple):
+    """
+    Tree with nodes numbered in post-order, so children come before their
+    parents and the root is last. Node i's metadata is
+    metadata[metadata_starts[i]:(metadata_starts[i] + num_metadata[i])] and
+    its children are child_ids[child_offsets[i]:child_offsets[i + 1]].
+    """
+    metadata: Sequence[int]
+    metadata_starts: array
+    num_metadata: array
+    child_offsets: array
+    child_ids: array
+
+
+def parse_flat(nums: Sequence[int]) -> FlatTree:
+    metadata_starts = array('l')
+    num_metadata_ = array('l')
+    child_offsets = array('l', [0])
+    child_ids = array('l')
+
+    # Each frame is [children left to parse, num metadata, child IDs so far]
+    stack: List[list] = [[nums[0], nums[1], []]]
+    pos = 2
+    while stack:
+        frame = stack[-1]
+        if frame[0]:
+            frame[0] -= 1
+            stack.append([nums[pos], nums[pos + 1], []])
+            pos += 2
+            continue
+
+        stack.pop()
+        _, num_metadata, children = frame
+        id = len(metadata_starts)
+        metadata_starts.append(pos)
+        num_metadata_.append(num_metadata)
+        child_ids.extend(children)
+        child_offsets.append(len(child_ids))
+        pos += num_metadata
+
+        if stack:
+            stack[-1][2].append(id)
+
+    return FlatTree(nums, metadata_starts, num_metadata_, child_offsets,
+                    child_ids)
+
+
+def metadata_sum(tree: FlatTree) -> int:
+    return sum(sum(tree.metadata[start:(start + num)])
+               for start, num in zip(tree.metadata_starts, tree.num_metadata))
+
+
+def root_value(tree: FlatTree) -> int:
+    """
+    Compute every node's value bottom-up in one pass, each from its
+    children's already computed values, and return the root's.
+    """
+    values = array('q', bytes(8 * len(tree.metadata_starts)))
+    for id, (start, num) in enumerate(zip(tree.metadata_starts,
+                                          tree.num_metadata)):
+        metadata = tree.metadata[start:(start + num)]
+        first_child = tree.child_offsets[id]
+        children = tree.child_ids[first_child:tree.child_offsets[id + 1]]
+        if children:
+            values[id] = sum(values[children[index - 1]] for index in metadata
+                             if 1 <= index <= len(children))
+        else:
+            values[id] = sum(metadata)
+    return values[-1]
+
+
 test_license = "2 3 0 3 10 11 12 1 1 0 1 99 2 1 1 2"
 test_nums = [int(num) for num in test_license.split()]
 test_parent = parse_nums(test_nums)
@@ -70,12 +152,27 @@ test_metadata = get_metadata(test_parent)
 assert test_metadata == [1, 1, 2, 10, 11, 12, 2, 99]
 assert sum(test_metadata) == 138
 assert get_value(test_parent) == 66
+test_flat = parse_flat(test_nums)
+assert list(test_flat.child_ids) == [1, 0, 2]
+assert list(test_flat.child_offsets) == [0, 0, 0, 1, 3]
+assert metadata_sum(test_flat) == 138
+assert root_value(test_flat) == 66
+
+# Deep enough to have overflowed the recursive parser
+test_deep_nums = array('i', [1, 1] * 100_000 + [0, 1, 5] + [1] * 100_000)
+test_deep_node = parse_nums(memoryview(test_deep_nums))
+for _ in range(100_000):
+    assert test_deep_node.metadata == [1]
+    test_deep_node, = test_deep_node.children
+assert test_deep_node == Node([], [5])
+test_deep_flat = parse_flat(memoryview(test_deep_nums))
+assert metadata_sum(test_deep_flat) == 100_005
+assert root_value(test_deep_flat) == 5
 
 
 if __name__ == '__main__':
     with open('data/day_08.txt') as f:
-        nums = [int(num) for num in f.read().split()]
-        parent = parse_nums(nums)
-        metadata = get_metadata(parent)
-        print(sum(metadata))
-        print(get_value(parent))
+        nums = array('i', map(int, f.read().split()))
+        tree = parse_flat(nums)
+        print(metadata_sum(tree))
+        print(root_value(tree))
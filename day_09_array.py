@@ -0,0 +1,64 @@
+"""
+Notes
+-----
+Store the circle as a doubly linked list of marble numbers, where `next[m]`
+and `prev[m]` are the marbles clockwise and counter-clockwise of marble `m`.
+
+Marble numbers are exactly 0..marbles, so both links fit in preallocated
+arrays and inserting or removing a marble is a handful of index updates.
+"""
+from array import array
+from collections import Counter
+from typing import Optional
+
+
+def marble_mania(players: int,
+                 marbles: int) -> Counter:
+
+    player_scores: Counter = Counter()
+    next_ = array('l', [0]) * (marbles + 1)
+    prev = array('l', [0]) * (marbles + 1)
+    current = 0
+    for marble in range(1, marbles + 1):
+        if not marble % 23:
+            player = player_from_turn(marble, players)
+
+            for _ in range(7):
+                current = prev[current]
+            bonus = current
+            left = prev[bonus]
+            current = next_[bonus]
+            next_[left] = current
+            prev[current] = left
+
+            player_scores[player] += (marble + bonus)
+        else:
+            left = next_[current]
+            right = next_[left]
+            next_[left] = marble
+            prev[marble] = left
+            next_[marble] = right
+            prev[right] = marble
+            current = marble
+
+    return player_scores
+
+
+def player_from_turn(turn: int, players: int) -> Optional[int]:
+    return (turn - 1) % players + 1 if turn > 0 else None
+
+
+def high_score(scores: Counter) -> int:
+    return scores.most_common(1)[0][1]
+
+
+assert high_score(marble_mania(10, 1618)) == 8317
+assert high_score(marble_mania(13, 7999)) == 146373
+assert high_score(marble_mania(17, 1104)) == 2764
+assert high_score(marble_mania(21, 6111)) == 54718
+assert high_score(marble_mania(30, 5807)) == 37305
+
+
+if __name__ == '__main__':
+    print(high_score(marble_mania(400, 71864)))
+    print(high_score(marble_mania(400, 71864 * 100)))
@@ -0,0 +1,144 @@
+"""
+Notes
+-----
+Every day 9 engine module exposes the same `marble_mania(players, marbles)`,
+so an engine is just the name of the module that implements it.
+
+Engine modules run their own asserts on import, so they're only imported
+when first asked for.
+
+Benchmark
+---------
+For each (players, marbles) size, run every engine once for time and once
+under tracemalloc for peak memory, then flag any engine whose high score
+disagrees with a strict majority of the engines for that size. If there's
+no strict majority, every engine is flagged.
+"""
+import tracemalloc
+from collections import Counter
+from importlib import import_module
+from time import perf_counter
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+
+ENGINES: Dict[str, str] = {
+    'list': 'day_09',
+    'deque': 'day_09_deque',
+    'array': 'day_09_array',
+}
+
+DEFAULT_ENGINE = 'deque'
+
+Engine = Callable[[int, int], Counter]
+
+
+def get_engine(name: str) -> Engine:
+    try:
+        module = ENGINES[name]
+    except KeyError:
+        raise ValueError(f'Unknown engine {name!r}, '
+                         f'expected one of {sorted(ENGINES)}') from None
+    return import_module(module).marble_mania
+
+
+def marble_mania(players: int,
+                 marbles: int,
+                 engine: str = DEFAULT_ENGINE) -> Counter:
+    return get_engine(engine)(players, marbles)
+
+
+def high_score(scores: Counter) -> int:
+    return scores.most_common(1)[0][1]
+
+
+class BenchmarkResult(NamedTuple):
+    engine: str
+    players: int
+    marbles: int
+    seconds: float
+    peak_bytes: int
+    high_score: int
+    agrees: bool
+
+
+def _run(engine: Engine, players: int, marbles: int) -> Tuple[float, int, int]:
+    start = perf_counter()
+    score = high_score(engine(players, marbles))
+    seconds = perf_counter() - start
+
+    tracemalloc.start()
+    try:
+        engine(players, marbles)
+        _, peak_bytes = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return seconds, peak_bytes, score
+
+
+def benchmark(sizes: Iterable[Tuple[int, int]],
+              engines: Optional[Iterable[str]] = None
+              ) -> List[BenchmarkResult]:
+    engines = list(ENGINES if engines is None else engines)
+    results: List[BenchmarkResult] = []
+    for players, marbles in sizes:
+        runs = {name: _run(get_engine(name), players, marbles)
+                for name in engines}
+
+        agrees = agreement({name: score
+                            for name, (_, _, score) in runs.items()})
+
+        for name, (seconds, peak_bytes, score) in runs.items():
+            results.append(BenchmarkResult(name, players, marbles,
+                                           seconds, peak_bytes,
+                                           score, agrees[name]))
+    return results
+
+
+def agreement(scores: Dict[str, int]) -> Dict[str, bool]:
+    """
+    Return whether each engine's score matches a strict majority of engines.
+    With no strict majority, no engine can be trusted, so none agree.
+    """
+    counts = Counter(scores.values())
+    expected, count = counts.most_common(1)[0]
+    if 2 * count <= len(scores):
+        return {name: False for name in scores}
+    return {name: score == expected for name, score in scores.items()}
+
+
+def format_results(results: List[BenchmarkResult]) -> str:
+    lines = [f'{"Engine":8} {"Players":>8} {"Marbles":>10} '
+             f'{"Seconds":>9} {"Peak MiB":>9} {"High score":>12}']
+    for result in results:
+        line = f'{result.engine:8} {result.players:8d} {result.marbles:10d} ' \
+               f'{result.seconds:9.3f} {result.peak_bytes / 2**20:9.2f} ' \
+               f'{result.high_score:12d}'
+        if not result.agrees:
+            line += '  DISAGREES'
+        lines.append(line)
+    return '\n'.join(lines)
+
+
+assert high_score(marble_mania(10, 1618)) == 8317
+assert high_score(marble_mania(10, 1618, engine='array')) == 8317
+
+test_results = benchmark([(9, 25), (10, 1618)], engines=['deque', 'array'])
+assert [result.high_score for result in test_results] == [32, 32, 8317, 8317]
+assert all(result.agrees for result in test_results)
+
+assert agreement({'list': 8317, 'deque': 8317, 'array': 1}) \
+    == {'list': True, 'deque': True, 'array': False}
+assert agreement({'bad': 1, 'deque': 8317}) == {'bad': False, 'deque': False}
+assert agreement({'deque': 8317}) == {'deque': True}
+
+
+if __name__ == '__main__':
+    # The list engine is quadratic, so only run it on the smaller sizes
+    small_sizes = [(players, marbles)
+                   for players in (10, 400)
+                   for marbles in (1_000, 5_000, 10_000)]
+    print(format_results(benchmark(small_sizes)))
+
+    large_sizes = [(400, 71864), (400, 71864 * 10), (400, 71864 * 100)]
+    print(format_results(benchmark(large_sizes, engines=['deque', 'array'])))
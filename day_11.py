@@ -3,66 +3,137 @@ Notes
 -----
 Build an array of power levels
 Slide a 3x3 window & calculate sum of power levels
+
+Part 2
+------
+Build a summed area table once, then any window sum is four lookups:
+    S[x + w, y + h] - S[x, y + h] - S[x + w, y] + S[x, y]
+so every window of a given size can be summed with array arithmetic.
 """
 import numpy as np
-from typing import Tuple
+from typing import List, Sequence, Tuple, Union
+
+
+GRID_SIZE = 300
 
 
 def build_power_levels(serial_no: int) -> np.ndarray:
-    n_x = 300
-    n_y = 300
-    power_levels = np.empty((n_x, n_y), dtype=int)
+    x = np.arange(1, GRID_SIZE + 1).reshape(-1, 1)
+    y = np.arange(1, GRID_SIZE + 1).reshape(1, -1)
+    return get_power_level(x, y, serial_no)
 
-    for x in range(n_x):
-        for y in range(n_y):
-            power_levels[x, y] = get_power_level(x + 1, y + 1, serial_no)
 
-    return power_levels
+def build_power_levels_batch(serial_nos: Sequence[int]) -> np.ndarray:
+    """
+    Return a (len(serial_nos), 300, 300) stack of power level grids.
+    """
+    x = np.arange(1, GRID_SIZE + 1).reshape(1, -1, 1)
+    y = np.arange(1, GRID_SIZE + 1).reshape(1, 1, -1)
+    serial_nos = np.asarray(serial_nos).reshape(-1, 1, 1)
+    return get_power_level(x, y, serial_nos)
 
 
-def get_power_level(x: int, y: int, serial_no: int) -> int:
+def get_power_level(x: Union[int, np.ndarray],
+                    y: Union[int, np.ndarray],
+                    serial_no: Union[int, np.ndarray]
+                    ) -> Union[int, np.ndarray]:
     rack_id = x + 10
     power_level = (rack_id * y + serial_no) * rack_id
     power_level = power_level // 100 % 10 - 5
     return power_level
 
 
+def summed_area_table(power_levels: np.ndarray) -> np.ndarray:
+    """
+    Return the integral image of `power_levels`, padded with a leading row and
+    column of zeros so that table[x, y] is the sum of power_levels[:x, :y].
+    """
+    n_x, n_y = power_levels.shape
+    table = np.zeros((n_x + 1, n_y + 1), dtype=int)
+    table[1:, 1:] = power_levels.cumsum(axis=0).cumsum(axis=1)
+    return table
+
+
+def window_sums(table: np.ndarray, width: int, height: int) -> np.ndarray:
+    """
+    Return the sum of every width x height window, indexed by its top-left
+    (0-based) cell, using four lookups per window into a summed area table.
+    """
+    return (table[width:, height:]
+            - table[:-width, height:]
+            - table[width:, :-height]
+            + table[:-width, :-height])
+
+
 def get_largest_square(power_levels: np.ndarray,
                        width: int = 3,
                        height: int = 3) -> Tuple[int, int, int]:
-    best_x = np.nan
-    best_y = np.nan
-    best_power_level = -np.inf
-    for x in range(0, power_levels.shape[0] - width + 2):
-        for y in range(0, power_levels.shape[1] - height + 2):
-            square = power_levels[x:(x + width), y:(y + height)]
-            power_level = square.sum()
-            if power_level > best_power_level:
-                best_x = x
-                best_y = y
-                best_power_level = power_level
-
-    return (best_x + 1, best_y + 1, best_power_level)
+    sums = window_sums(summed_area_table(power_levels), width, height)
+    x, y = np.unravel_index(sums.argmax(), sums.shape)
+    return (int(x) + 1, int(y) + 1, int(sums[x, y]))
 
 
-def get_largest_total_square(power_levels: np.ndarray):
+def get_largest_total_square(power_levels: np.ndarray
+                             ) -> Tuple[int, int, int, int]:
+    table = summed_area_table(power_levels)
     best_x = np.nan
     best_y = np.nan
     best_size = np.nan
     best_power_level = -np.inf
-    for size in range(100):
-        x, y, power_level = get_largest_square(power_levels,
-                                               width=size,
-                                               height=size)
+    for size in range(1, min(power_levels.shape) + 1):
+        sums = window_sums(table, size, size)
+        index = sums.argmax()
+        power_level = sums.flat[index]
         if power_level > best_power_level:
-            best_x = x
-            best_y = y
+            best_x, best_y = np.unravel_index(index, sums.shape)
             best_size = size
             best_power_level = power_level
-        elif power_level < 0:
-            break
 
-    return (best_x, best_y, best_size, best_power_level)
+    return (int(best_x) + 1, int(best_y) + 1, best_size, int(best_power_level))
+
+
+def get_largest_total_squares(serial_nos: Sequence[int],
+                               batch_size: int = 64
+                               ) -> List[Tuple[int, int, int, int]]:
+    """
+    Return the largest total square for each serial number, building and
+    scanning the grids `batch_size` serial numbers at a time.
+    """
+    results: List[Tuple[int, int, int, int]] = []
+    for start in range(0, len(serial_nos), batch_size):
+        batch = serial_nos[start:(start + batch_size)]
+        power_levels = build_power_levels_batch(batch)
+        n_serials, n_x, n_y = power_levels.shape
+
+        table = np.zeros((n_serials, n_x + 1, n_y + 1), dtype=np.int32)
+        table[:, 1:, 1:] = power_levels.cumsum(axis=1).cumsum(axis=2)
+
+        best_x = np.zeros(n_serials, dtype=int)
+        best_y = np.zeros(n_serials, dtype=int)
+        best_size = np.zeros(n_serials, dtype=int)
+        best_power_level = np.full(n_serials, np.iinfo(np.int32).min,
+                                   dtype=np.int32)
+        for size in range(1, min(n_x, n_y) + 1):
+            sums = (table[:, size:, size:]
+                    - table[:, :-size, size:]
+                    - table[:, size:, :-size]
+                    + table[:, :-size, :-size]).reshape(n_serials, -1)
+            index = sums.argmax(axis=1)
+            power_level = sums[np.arange(n_serials), index]
+
+            better = power_level > best_power_level
+            x, y = np.divmod(index, n_y - size + 1)
+            best_x[better] = x[better]
+            best_y[better] = y[better]
+            best_size[better] = size
+            best_power_level[better] = power_level[better]
+
+        results.extend(zip((best_x + 1).tolist(),
+                           (best_y + 1).tolist(),
+                           best_size.tolist(),
+                           best_power_level.tolist()))
+
+    return results
 
 
 assert get_power_level(3, 5, 8) == 4
@@ -79,6 +150,11 @@ assert get_largest_square(test_power_levels_42) == (21, 61, 30)
 assert get_largest_total_square(test_power_levels_18) == (90, 269, 16, 113)
 assert get_largest_total_square(test_power_levels_42) == (232, 251, 12, 119)
 
+assert np.array_equal(build_power_levels_batch([18, 42]),
+                      np.stack([test_power_levels_18, test_power_levels_42]))
+assert get_largest_total_squares([18, 42], batch_size=1) \
+    == [(90, 269, 16, 113), (232, 251, 12, 119)]
+
 power_levels = build_power_levels(4455)
 print(get_largest_square(power_levels))
 print(get_largest_total_square(power_levels))